@@ -1,67 +1,43 @@
 import streamlit as st
 import pandas as pd
-from difflib import get_close_matches
-from itertools import tee
-import os
+import numpy as np
+from itertools import pairwise
+import sanad_core
 
-# Load and prepare dataset
-@st.cache_data
-def load_data():
-    base_dir = os.path.dirname(__file__)
-    candidates = [
-        'narrators_dataset_v3.csv',
-        os.path.join(base_dir, 'narrators_dataset_v3.csv'),
-        '/mnt/data/narrators_dataset_v3.csv'
-    ]
-    csv_file = next((p for p in candidates if os.path.exists(p)), None)
-    if csv_file is None:
-        st.error(
-            "Data file 'narrators_dataset_v3.csv' not found. "
-            "Please upload the CSV into the same directory as app.py or place it in '/mnt/data'."
-        )
-        return pd.DataFrame()
-    df = pd.read_csv(csv_file)
-    # Filter valid lifespans
-    df = df[(df['birth_greg'] > 0) & (df['death_greg'] > 0)]
-    df = df[df['birth_greg'] != df['death_greg']]
-    # Normalize column names
-    df.columns = df.columns.str.strip().str.lower()
-    # Parse places_of_stay into cities list
-    df['cities'] = df['places_of_stay']\
-        .fillna('')\
-        .apply(lambda x: [c.strip().lower() for c in x.split(',') if c.strip()])
-    # Parse student and teacher indices
-    df['students_index'] = df['students_index']\
-        .fillna('')\
-        .apply(lambda x: [int(i) for i in str(x).split(',') if i.strip().isdigit()])
-    df['teachers_index'] = df['teachers_index']\
-        .fillna('')\
-        .apply(lambda x: [int(i) for i in str(x).split(',') if i.strip().isdigit()])
-    return df
-
-narrators_df = load_data()
-
-# App configuration
+# App configuration; emitted before the data load so the page paints first
 st.set_page_config(layout="wide")
 st.title("Hadith Narrator Nexus Verifier")
 st.markdown("Visualize and validate the hand-off between hadith narrators.")
 
-# Search helper
-def search_narrators(query, choices, cutoff=0.7, n=8):
-    q = query.lower().strip()
-    substr = [c for c in choices if q in c.lower()]
-    if substr:
-        return substr[:n]
-    lowered = [c.lower() for c in choices]
-    fuzzy = get_close_matches(q, lowered, n=n, cutoff=cutoff)
-    return [choices[i] for i, lc in enumerate(lowered) if lc in fuzzy]
+with st.spinner("Loading narrators…"):
+    narrators = sanad_core.get_dataset()
+if narrators is None:
+    st.error(
+        "Data file 'narrators_dataset_v3.csv' not found. "
+        "Please upload the CSV into the same directory as app.py or place it in '/mnt/data'."
+    )
+    st.stop()
+
+STATUS_LABELS = {
+    sanad_core.TEACHER_OF: "🟢 Silsilah muttasilah",
+    sanad_core.STUDENT_OF: "🟢 Silsilah muttasilah",
+    sanad_core.STRONG: "✅ Strong",
+    sanad_core.STRONG_GEO: "✅ Strong (Geo)",
+    sanad_core.WEAK: "🟡 Weak",
+    sanad_core.NONE: "❌ None",
+}
 
 # Initialize session state
-for k, default in [('narrator_chain', []), ('matches', []), ('input', ''), ('selected', '')]:
+for k, default in [
+    ('narrator_chain', []), ('matches', []), ('input', ''), ('selected', ''), ('editor_version', 0)
+]:
     if k not in st.session_state:
         st.session_state[k] = default
 
 # Callbacks
+def update_matches():
+    st.session_state.matches = list(narrators.search(st.session_state.input.lower().strip()))
+
 def add_narrator():
     sel = st.session_state.selected
     if sel and sel not in st.session_state.narrator_chain:
@@ -70,10 +46,17 @@ def add_narrator():
     st.session_state.matches = []
     st.session_state.selected = ''
 
-def remove_narrator(idx):
-    chain = st.session_state.narrator_chain
-    if 0 <= idx < len(chain):
-        chain.pop(idx)
+def apply_chain_edits(editor_key):
+    edits = st.session_state[editor_key]
+    # Rows leave the chain either by being deleted or by ticking Remove
+    removed = set(edits['deleted_rows']) | {
+        int(i) for i, change in edits['edited_rows'].items() if change.get('Remove')
+    }
+    st.session_state.narrator_chain = [
+        n for i, n in enumerate(st.session_state.narrator_chain) if i not in removed
+    ]
+    # A fresh editor key drops the applied edits from widget state
+    st.session_state.editor_version += 1
     st.session_state.matches = []
     st.session_state.selected = ''
     st.session_state.input = ''
@@ -89,14 +72,11 @@ st.subheader("Add Narrator to Chain")
 st.text_input(
     "Type a narrator's name (partial allowed):",
     key='input',
-    on_change=lambda: st.session_state.update({
-        'matches': search_narrators(
-            st.session_state.input,
-            narrators_df['name_letters'].tolist()
-        )
-    })
+    on_change=update_matches
 )
-if st.session_state.input and not st.session_state.matches:
+if st.session_state.input and len(st.session_state.input.strip()) < sanad_core.MIN_QUERY_LEN:
+    st.info(f"Type at least {sanad_core.MIN_QUERY_LEN} characters to search.")
+elif st.session_state.input and not st.session_state.matches:
     st.error("Unable to find narrator. Please try a different name.")
 
 if st.session_state.matches:
@@ -107,66 +87,77 @@ if st.session_state.matches:
 chain = st.session_state.narrator_chain
 if chain:
     st.markdown("**Selected Chain (Earliest to Latest):**")
-    for idx, name in enumerate(chain):
-        row = narrators_df[narrators_df['name_letters'] == name].iloc[0]
-        grade = row.get('grade', '—') if pd.notna(row.get('grade', None)) else '—'
-        c1, c2 = st.columns([0.9, 0.1])
-        with c1:
-            st.write(f"{idx+1}. {name} — Grade: {grade}")
-        with c2:
-            st.button("❌", key=f"remove_{idx}", on_click=remove_narrator, args=(idx,))
+    chain_rows = [narrators.name_to_i[n] for n in chain]
+    editor_key = f"chain_editor_{st.session_state.editor_version}"
+    # One editor widget for the whole chain; deleting rows removes narrators
+    st.data_editor(
+        pd.DataFrame(
+            {
+                'Narrator': chain,
+                'Arabic': narrators.arabic[chain_rows],
+                'Grade': narrators.grade[chain_rows],
+                'Remove': False,
+            },
+            index=pd.RangeIndex(1, len(chain) + 1, name='#'),
+        ),
+        num_rows='delete',
+        disabled=['Narrator', 'Arabic', 'Grade'],
+        key=editor_key,
+        on_change=apply_chain_edits,
+        args=(editor_key,),
+    )
     st.button("Reset Chain", on_click=reset_chain)
 
-# Results cards
-if len(chain) >= 2:
-    st.subheader("Sanad Validation Results")
-    lookup = narrators_df.set_index('name_letters')
-    for i, (a, b) in enumerate(zip(chain, chain[1:]), start=1):
-        ra = lookup.loc[a]
-        rb = lookup.loc[b]
-        # Temporal overlap
-        overlap_years = max(
-            0,
-            min(ra['death_greg'], rb['death_greg']) - max(ra['birth_greg'], rb['birth_greg'])
-        )
-        # Geographic overlap
-        common = set(ra['cities']).intersection(rb['cities'])
-        # Direct isnad check
-        a_idx = ra['scholar_index']
-        b_idx = rb['scholar_index']
-        is_teacher = b_idx in ra['students_index'] or a_idx in rb['teachers_index']
-        is_student = b_idx in ra['teachers_index'] or a_idx in rb['students_index']
-        # Link label
-        if is_teacher:
-            link_label = f"{a} is the teacher of {b}"
-        elif is_student:
-            link_label = f"{a} is the student of {b}"
-        else:
-            link_label = "None"
-        # Status
-        if is_teacher or is_student:
-            status = "🟢 Silsilah muttasilah"
-        elif overlap_years >= 10:
-            status = "✅ Strong"
-        elif overlap_years >= 1 and common:
-            status = "✅ Strong (Geo)"
-        elif overlap_years >= 1:
-            status = "🟡 Weak"
-        else:
-            status = "❌ None"
-        geo = ', '.join([c.title() for c in sorted(common)]) if common else '—'
-        # Render card
-        st.markdown(f"""
-**{i}. {a} → {b}**  
+# Validation results, memoised per chain so reruns from other widgets skip scoring and formatting
+@st.cache_data(max_entries=64, show_spinner=False)
+def validate_chain(chain):
+    cities = narrators.cities
+    # Score every adjacent pair in one kernel call
+    rows = np.array([narrators.name_to_i[n] for n in chain])
+    statuses, overlaps = narrators.score(rows)
+    ia, ib = rows[:-1], rows[1:]
+    pairs = list(pairwise(chain))
+    shared = [cities[i] & cities[j] for i, j in zip(ia, ib)]
+    results = pd.DataFrame({
+        'Pair': [f"{a} → {b}" for a, b in pairs],
+        'Status': [STATUS_LABELS[code] for code in statuses],
+        'Lifespan A': narrators.lifespan[ia],
+        'Lifespan B': narrators.lifespan[ib],
+        'Overlap (years)': overlaps,
+        'Shared City': [
+            ', '.join(narrators.city_titles[c] for c in sorted(s)) if s else '—' for s in shared
+        ],
+        'Student-Teacher Link': [
+            f"{a} is the teacher of {b}" if code == sanad_core.TEACHER_OF
+            else f"{a} is the student of {b}" if code == sanad_core.STUDENT_OF
+            else "None"
+            for (a, b), code in zip(pairs, statuses)
+        ],
+    })
+    cards = [
+        f"""
+**{k}. {a} → {b}**  
 • **Status:** {status}  
-• **Lifespan {a}:** {ra['birth_greg']} CE – {ra['death_greg']} CE  
-• **Lifespan {b}:** {rb['birth_greg']} CE – {rb['death_greg']} CE  
+• **Lifespan {a}:** {life_a}  
+• **Lifespan {b}:** {life_b}  
 • **Overlap Duration:** {overlap_years} year{'s' if overlap_years != 1 else ''}  
 • **Shared City:** {geo}  
 • **Student-Teacher Link:** {link_label}
 """
-        )
-        st.divider()
+        for k, ((a, b), status, life_a, life_b, overlap_years, geo, link_label) in enumerate(zip(
+            pairs, results['Status'], results['Lifespan A'], results['Lifespan B'], overlaps,
+            results['Shared City'], results['Student-Teacher Link']
+        ), start=1)
+    ]
+    return results, "\n---\n".join(cards)
+
+if len(chain) >= 2:
+    st.subheader("Sanad Validation Results")
+    results, details = validate_chain(tuple(chain))
+    # Render all pairs as one table; full cards stay available on demand
+    st.dataframe(results, hide_index=True)
+    with st.expander("Detailed view"):
+        st.markdown(details)
 elif len(chain) == 1:
     st.info("Select at least two narrators to see validation.")
 else:
@@ -0,0 +1,23 @@
+# Build the cleaned Parquet sidecar ahead of time, for deployments where
+# the app directory is read-only at runtime. The sidecar is a build
+# artifact (git-ignored): run this as a deploy step and ship the output
+# next to the CSV. It records SIDECAR_VERSION and the CSV's size and
+# SHA-256, so it is picked up regardless of file mtimes and rebuilt
+# automatically once either the CSV or clean_source() changes.
+#
+#   python prepare_dataset.py [path/to/narrators_dataset_v3.csv]
+import sys
+
+import sanad_core
+
+def main(argv):
+    csv_file = argv[1] if len(argv) > 1 else sanad_core.find_source()
+    if csv_file is None:
+        sys.exit("Data file 'narrators_dataset_v3.csv' not found.")
+    df = sanad_core.parse_source(csv_file)
+    sidecar = sanad_core.sidecar_path(csv_file)
+    sanad_core.write_sidecar(df, sidecar, csv_file)
+    print(f"Wrote {len(df)} narrators to {sidecar}")
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,312 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Callable
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import streamlit as st
+
+try:
+    from rapidfuzz import process, fuzz
+except ImportError:
+    process = fuzz = None
+
+# Pair status codes returned by score_chain
+NONE, WEAK, STRONG_GEO, STRONG, STUDENT_OF, TEACHER_OF = range(6)
+
+MIN_QUERY_LEN = 2
+
+# Bump whenever clean_source's output changes, so existing sidecars are rebuilt
+SIDECAR_VERSION = 2
+
+def trigrams(s):
+    return {s[k:k + 3] for k in range(len(s) - 2)}
+
+def build_trigram_index(names_lower):
+    index = defaultdict(set)
+    for i, name in enumerate(names_lower):
+        for gram in trigrams(name):
+            index[gram].add(i)
+    return dict(index)
+
+def split_cells(values, lower=False):
+    # Split comma-separated cells with Arrow kernels; returns the list array and trimmed tokens
+    arr = pa.array(values)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    arr = pc.fill_null(pc.cast(arr, pa.string()), '')
+    if lower:
+        arr = pc.utf8_lower(arr)
+    parts = pc.split_pattern(arr, pattern=',')
+    return parts, pc.utf8_trim_whitespace(pc.list_flatten(parts))
+
+def split_tokens(values, lower=False):
+    parts, tokens = split_cells(values, lower)
+    return pa.ListArray.from_arrays(parts.offsets, tokens).to_pylist()
+
+def split_ids(values):
+    # Keep numeric tokens only and cast them to int64 without leaving Arrow
+    parts, tokens = split_cells(values)
+    keep = pc.ascii_is_decimal(tokens)
+    rows = pc.filter(pc.list_parent_indices(parts), keep).to_numpy()
+    ids = pc.cast(pc.filter(tokens, keep), pa.int64())
+    offsets = np.zeros(len(parts) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=len(parts)), out=offsets[1:])
+    return pa.ListArray.from_arrays(pa.array(offsets), ids).to_pylist()
+
+def to_csr(groups):
+    # Flatten an iterable of int collections into sorted (data, ptr) arrays
+    groups = [sorted(g) for g in groups]
+    ptr = np.zeros(len(groups) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(g) for g in groups])
+    data = np.fromiter((v for g in groups for v in g), dtype=np.int32, count=ptr[-1])
+    return data, ptr
+
+def to_bitset(groups, scholar):
+    # Bit r of row i is set when row r's scholar index is in groups[i]
+    pos = {s: r for r, s in enumerate(scholar)}
+    pairs = [(i, pos[s]) for i, g in enumerate(groups) for s in g if s in pos]
+    bits = np.zeros((len(groups), (len(scholar) + 63) // 64), dtype=np.uint64)
+    if pairs:
+        rows, cols = np.array(pairs).T
+        np.bitwise_or.at(bits, (rows, cols >> 6), np.uint64(1) << (cols & 63).astype(np.uint64))
+    return bits
+
+# Filter, normalise and parse the raw table; list columns come out as plain lists
+def clean_source(df):
+    # Filter valid lifespans
+    birth, death = df['birth_greg'], df['death_greg']
+    df = df[(birth > 0) & (death > 0) & (birth != death)].reset_index(drop=True)
+    # Normalize column names
+    df.columns = df.columns.str.strip().str.lower()
+    # Compact dtypes: years fit int16, grade is low-cardinality
+    df = df.astype({'birth_greg': np.int16, 'death_greg': np.int16})
+    # Missing or blank grades get the display sentinel once, so rendering needs no per-row checks
+    grade = df['grade'].fillna('').astype(str).str.strip()
+    df['grade'] = grade.where(grade != '', '—').astype('category')
+    # Parse places_of_stay into cities
+    df['cities'] = [
+        [c for c in cities if c]
+        for cities in split_tokens(df['places_of_stay'], lower=True)
+    ]
+    # Parse student and teacher indices
+    for col in ('students_index', 'teachers_index'):
+        df[col] = split_ids(df[col])
+    return df
+
+def sidecar_path(csv_file):
+    return os.path.splitext(csv_file)[0] + '.clean.parquet'
+
+def parse_source(csv_file):
+    # Arrow-backed columns feed the pc.split_pattern parse without an object round-trip
+    return clean_source(pd.read_csv(csv_file, engine='pyarrow', dtype_backend='pyarrow'))
+
+def source_fingerprint(csv_file):
+    # Content-based, so a sidecar stays valid however the CSV was checked out or copied
+    digest = hashlib.sha256()
+    with open(csv_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f'{os.path.getsize(csv_file)}:{digest.hexdigest()}'.encode()
+
+def sidecar_metadata(csv_file):
+    return {
+        b'sidecar_version': str(SIDECAR_VERSION).encode(),
+        b'source_csv': source_fingerprint(csv_file),
+    }
+
+def write_sidecar(df, sidecar, csv_file):
+    # Write to a temp file and rename it into place, so readers never see a partial sidecar
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, **sidecar_metadata(csv_file)})
+    tmp = f'{sidecar}.{os.getpid()}.tmp'
+    try:
+        pq.write_table(table, tmp)
+        os.replace(tmp, sidecar)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def sidecar_is_current(sidecar, csv_file):
+    if not os.path.exists(sidecar):
+        return False
+    meta = pq.read_schema(sidecar).metadata or {}
+    return all(meta.get(k) == v for k, v in sidecar_metadata(csv_file).items())
+
+def read_source(csv_file):
+    # The cleaned table is persisted next to the CSV, so later cold starts are one Parquet read
+    sidecar = sidecar_path(csv_file)
+    try:
+        if sidecar_is_current(sidecar, csv_file):
+            return pd.read_parquet(sidecar)
+    except (OSError, pa.ArrowException):
+        # Truncated or corrupt sidecar: fall through and rebuild it from the CSV
+        pass
+    df = parse_source(csv_file)
+    try:
+        write_sidecar(df, sidecar, csv_file)
+    except OSError:
+        pass
+    return df
+
+def find_source():
+    base_dir = os.path.dirname(__file__)
+    candidates = [
+        'narrators_dataset_v3.csv',
+        os.path.join(base_dir, 'narrators_dataset_v3.csv'),
+        '/mnt/data/narrators_dataset_v3.csv'
+    ]
+    return next((p for p in candidates if os.path.exists(p)), None)
+
+# Load and prepare dataset
+def load_data():
+    csv_file = find_source()
+    if csv_file is None:
+        return None
+    df = read_source(csv_file)
+    df['name_letters'] = df['name_letters'].astype('string[pyarrow]')
+    # Parquet round-trips lists as arrays; the lookups below want frozensets
+    for col in ('cities', 'students_index', 'teachers_index'):
+        df[col] = [frozenset(v) for v in df[col]]
+    return df
+
+# Search helper
+def search_narrators(query, names, names_lower, trigram_index, cutoff=0.7, n=8):
+    q = query.lower().strip()
+    if len(q) < MIN_QUERY_LEN:
+        return []
+    # Narrow candidates via trigram postings; short queries need a full scan
+    if len(q) < 3:
+        exact = np.arange(len(names_lower))
+        pool = range(len(names_lower))
+    else:
+        postings = [trigram_index.get(g, set()) for g in trigrams(q)]
+        exact = np.array(sorted(set(postings[0]).intersection(*postings[1:])), dtype=np.intp)
+        pool = sorted(set().union(*postings)) or range(len(names_lower))
+    hits = exact[np.char.find(names_lower[exact], q) >= 0]
+    if hits.size:
+        return [names[i] for i in hits[:n]]
+    choices = {i: names_lower[i] for i in pool}
+    if process is None:
+        fuzzy = get_close_matches(q, list(choices.values()), n=n, cutoff=cutoff)
+        return [names[i] for i, lc in choices.items() if lc in fuzzy]
+    fuzzy = process.extract(q, choices, scorer=fuzz.ratio, limit=n, score_cutoff=cutoff * 100)
+    return [names[i] for _, _, i in fuzzy]
+
+@dataclass(slots=True)
+class NarratorBundle:
+    df: pd.DataFrame
+    names: np.ndarray
+    names_lower: np.ndarray
+    trigram_index: dict
+    name_to_i: dict
+    # Column-wise (SoA) copies of the per-narrator fields, indexed via name_to_i
+    birth: np.ndarray
+    death: np.ndarray
+    arabic: np.ndarray
+    grade: np.ndarray
+    lifespan: np.ndarray
+    scholar: np.ndarray
+    cities: np.ndarray
+    # Row x row bitsets of direct student/teacher links
+    students: np.ndarray
+    teachers: np.ndarray
+    # CSR (data, ptr) of int-coded cities, plus each city's display form
+    city_codes: tuple
+    city_titles: dict
+    search: Callable
+
+    def score(self, rows):
+        return score_chain(
+            rows, self.birth, self.death,
+            self.students, self.teachers, *self.city_codes
+        )
+
+def build_bundle(df):
+    # Labels are the lookup key everywhere; different narrators sharing a name get their scholar index
+    name = df['name_letters'].astype(str)
+    label = name.where(~name.duplicated(keep=False), name + ' #' + df['scholar_index'].astype(str))
+    names = label.to_numpy(dtype=object)
+    # Fixed-width unicode so np.char.find can scan it in C
+    names_lower = label.str.lower().to_numpy().astype(str)
+    trigram_index = build_trigram_index(names_lower)
+
+    # Memoized per normalised query; lives as long as the cached bundle
+    @lru_cache(maxsize=256)
+    def search(q, cutoff=0.7, n=8):
+        return tuple(search_narrators(q, names, names_lower, trigram_index, cutoff, n))
+
+    name_to_i = {name: i for i, name in enumerate(names)}
+    city_vocab = sorted(frozenset().union(*df['cities']))
+    city_codes = {c: k for k, c in enumerate(city_vocab)}
+    scholar = df['scholar_index'].to_numpy(np.int64)
+    return NarratorBundle(
+        df=df,
+        names=names,
+        names_lower=names_lower,
+        trigram_index=trigram_index,
+        name_to_i=name_to_i,
+        birth=df['birth_greg'].to_numpy(np.int32),
+        death=df['death_greg'].to_numpy(np.int32),
+        arabic=df['name_arabic'].fillna('').to_numpy(),
+        grade=df['grade'].to_numpy(),
+        lifespan=(df['birth_greg'].astype(str) + '–' + df['death_greg'].astype(str) + ' CE').to_numpy(),
+        scholar=scholar,
+        cities=df['cities'].to_numpy(),
+        students=to_bitset(df['students_index'], scholar),
+        teachers=to_bitset(df['teachers_index'], scholar),
+        city_codes=to_csr([city_codes[c] for c in cities] for cities in df['cities']),
+        city_titles={c: c.title() for c in city_vocab},
+        search=search,
+    )
+
+# One bundle per process, shared by reference across sessions and reruns
+@st.cache_resource(show_spinner=False)
+def get_dataset():
+    df = load_data()
+    return None if df is None else build_bundle(df)
+
+# Chains are short, so these plain loops beat paying a JIT compile per fresh process
+def _has_bit(bits, i, j):
+    return ((bits[i, j >> 6] >> np.uint64(j & 63)) & np.uint64(1)) != 0
+
+def _intersects(data, ptr, i, j):
+    a, a_end = ptr[i], ptr[i + 1]
+    b, b_end = ptr[j], ptr[j + 1]
+    while a < a_end and b < b_end:
+        if data[a] == data[b]:
+            return True
+        if data[a] < data[b]:
+            a += 1
+        else:
+            b += 1
+    return False
+
+def score_chain(rows, birth, death, students, teachers, c_data, c_ptr):
+    n = len(rows) - 1
+    status = np.empty(n, dtype=np.int8)
+    overlap = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        i, j = rows[k], rows[k + 1]
+        ov = max(0, min(death[i], death[j]) - max(birth[i], birth[j]))
+        overlap[k] = ov
+        if _has_bit(students, i, j) or _has_bit(teachers, j, i):
+            status[k] = TEACHER_OF
+        elif _has_bit(teachers, i, j) or _has_bit(students, j, i):
+            status[k] = STUDENT_OF
+        elif ov >= 10:
+            status[k] = STRONG
+        elif ov >= 1 and _intersects(c_data, c_ptr, i, j):
+            status[k] = STRONG_GEO
+        elif ov >= 1:
+            status[k] = WEAK
+        else:
+            status[k] = NONE
+    return status, overlap